@@ -36,7 +36,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
       }
       
       // Process the voice note with the binary data
-      processVoiceNote(message.audioBinary)
+      processVoiceNote(message.audioBinary, message.chatId)
         .then(result => {
           console.log("Voice note processed successfully:", result);
           sendResponse({ success: true, result });
@@ -58,7 +58,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
       }
       
       // Process the voice note
-      processVoiceNote(message.audioBlob)
+      processVoiceNote(message.audioBlob, message.chatId)
         .then(result => {
           console.log("Voice note processed successfully:", result);
           sendResponse({ success: true, result });
@@ -79,7 +79,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
         const arrayBuffer = uint8Array.buffer;
         
         // Process with the reconstructed ArrayBuffer
-        processVoiceNote(arrayBuffer)
+        processVoiceNote(arrayBuffer, message.chatId)
           .then(result => {
             console.log("Voice note processed successfully:", result);
             sendResponse({ success: true, result });
@@ -112,7 +112,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
 });
 // In background.js - Update the processVoiceNote function to handle larger chunks
 
-async function processVoiceNote(audioBinaryData) {
+async function processVoiceNote(audioBinaryData, chatId = null) {
   try {
     console.log("Processing audio data in background script");
     console.log("Data type:", typeof audioBinaryData);
@@ -167,6 +167,11 @@ async function processVoiceNote(audioBinaryData) {
     const filename = `voice_note_${Date.now()}.webm`;
     formData.append('audio', audioBlob, filename);
     
+    // Lets a router keep each chat on the same server and tags history records
+    if (chatId) {
+      formData.append('chat_id', chatId);
+    }
+    
     // Increased timeout for larger file uploads
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), 60000); // 60 second timeout for larger files
@@ -10,6 +10,8 @@ const WHATSAPP_SELECTORS = {
   CHAT_INPUT: 'div[aria-label="Type a message"], div[contenteditable="true"][data-testid="conversation-compose-box-input"], div[contenteditable="true"][data-lexical-editor="true"]',
   CONTACTS: 'div[data-testid="cell-frame-container"]',
   CONTACT_NAME: 'span[dir="auto"][aria-label]',
+  // Title of the currently open chat, used as its chat id on the server
+  CHAT_TITLE: '#main header span[title], #main header span[dir="auto"]',
   // Selectors for group chats
   GROUP_HEADER: 'div[role="button"] span.selectable-text.copyable-text',
   GROUP_MEMBERS: 'div.x78zum5.x1cy8zhl.xisnujt.x1nxh6w3.xcgms0a.x16cd2qt span.selectable-text.copyable-text'
@@ -38,6 +40,15 @@ function initialize() {
   setInterval(extractContacts, 30000);
 }
 
+// Get an identifier for the currently open chat
+function getCurrentChatId() {
+  const titleElement = document.querySelector(WHATSAPP_SELECTORS.CHAT_TITLE);
+  if (!titleElement) {
+    return null;
+  }
+  return (titleElement.getAttribute("title") || titleElement.textContent || "").trim() || null;
+}
+
 // Extract contacts from WhatsApp UI
 function extractContacts() {
   // First, extract contacts from the contact list
@@ -380,6 +391,8 @@ function processRecordedAudio() {
     // We need to convert the blob to ArrayBuffer to send via Chrome messaging
     console.log("Converting blob to array buffer for messaging");
     const reader = new FileReader();
+    // Read the chat now; the user may switch chats before the message is sent
+    const chatId = getCurrentChatId();
     
     reader.onload = function(event) {
       const arrayBuffer = event.target.result;
@@ -398,6 +411,7 @@ function processRecordedAudio() {
             // Send as array for better serialization through Chrome messaging
             audioBlobArray: arrayData,
             byteLength: arrayBuffer.byteLength,
+            chatId: chatId,
             timestamp: Date.now()
           },
           (response) => {
@@ -1,11 +1,11 @@
 """
 WhatsApp Voice Tagger - Main Entry Point
-This script starts the Flask server that processes voice notes
+This script starts the Flask server that processes voice notes,
+or a router in front of several such servers when ROUTER_NODES is set
 """
 
 import os
 import logging
-from server.app import app
 
 # Configure logging
 logging.basicConfig(
@@ -16,10 +16,19 @@ logging.basicConfig(
 if __name__ == "__main__":
     # Get port from environment or use default
     port = int(os.environ.get("PORT", 5000))
-    
+
+    if os.environ.get("ROUTER_NODES"):
+        # Router mode: forward requests to backend servers, no models loaded here
+        from server.router import create_router_app, router_nodes_from_env
+        app = create_router_app(router_nodes_from_env())
+        debug = False  # The reloader would start a second health checker
+    else:
+        from server.app import app
+        debug = True   # Enable debug mode for development
+
     # Run the app
     app.run(
         host="0.0.0.0",  # Make the server publicly available
         port=port,
-        debug=True       # Enable debug mode for development
-    )
\ No newline at end of file
+        debug=debug
+    )
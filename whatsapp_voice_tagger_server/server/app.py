@@ -1,14 +1,19 @@
 import os
+import atexit
 import logging
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_from_directory, send_file
 from flask_cors import CORS
 import tempfile
+import time
 import uuid
 from werkzeug.utils import secure_filename
 
 from server.transcriber import WhisperTranscriber
 from server.entity_extractor import EntityExtractor
 from server.model_downloader import ensure_models_downloaded
+from server.auth import require_admin
+from server.history_store import TranscriptHistoryStore
+from server.profiler import RequestProfiler, format_collapsed, format_stats, transcription_trace
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -24,6 +29,21 @@ UPLOAD_FOLDER = os.path.join(tempfile.gettempdir(), 'whatsapp_voice_tagger')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Transcript history is opt-in: set HISTORY_DB_PATH to enable it
+HISTORY_DB_PATH = os.environ.get("HISTORY_DB_PATH")
+HISTORY_RETENTION_DAYS = os.environ.get("HISTORY_RETENTION_DAYS")
+history_store = None
+if HISTORY_DB_PATH:
+    history_store = TranscriptHistoryStore(
+        HISTORY_DB_PATH,
+        retention_days=float(HISTORY_RETENTION_DAYS) if HISTORY_RETENTION_DAYS else None,
+    )
+    # Write out queued records on shutdown; the writer thread is a daemon
+    atexit.register(history_store.close)
+
+# Profiling is off until an admin enables it; admin endpoints need ADMIN_TOKEN
+profiler = RequestProfiler()
+
 # Initialize models
 transcriber = None
 entity_extractor = None
@@ -55,7 +75,12 @@ def process_audio():
     if 'audio' not in request.files:
         return jsonify({"error": "No audio file provided"}), 400
     
+    # A single attribute check when profiling is off
+    session = profiler.begin(request.headers) if profiler.active else None
+    
     try:
+        start_time = time.perf_counter()
+        
         # Save uploaded file
         audio_file = request.files['audio']
         filename = str(uuid.uuid4()) + secure_filename(audio_file.filename)
@@ -71,26 +96,152 @@ def process_audio():
         
         # Transcribe audio
         logger.info("Transcribing audio...")
-        transcription = transcriber.transcribe(filepath)
+        transcribe_start = time.perf_counter()
+        with transcription_trace(session):
+            details = transcriber.transcribe_with_details(filepath)
+        transcribe_ms = (time.perf_counter() - transcribe_start) * 1000
+        transcription = details["text"]
         logger.info(f"Transcription: {transcription}")
         
         # Extract addressee
         logger.info("Extracting addressee...")
+        extract_start = time.perf_counter()
         addressee = entity_extractor.extract_addressee(transcription)
+        extract_ms = (time.perf_counter() - extract_start) * 1000
         logger.info(f"Extracted addressee: {addressee}")
         
         # Clean up
         os.remove(filepath)
         
-        return jsonify({
+        # Queue for the background writer; never blocks on disk
+        if history_store is not None:
+            history_store.record(
+                transcription,
+                addressee=addressee,
+                chat_id=request.form.get('chat_id'),
+                duration=details["duration"],
+                transcribe_ms=transcribe_ms,
+                extract_ms=extract_ms,
+                total_ms=(time.perf_counter() - start_time) * 1000,
+            )
+        
+        result = {
             "success": True,
             "transcription": transcription,
             "addressee": addressee
-        })
+        }
+        if session is not None:
+            result["profile_id"] = session.id
+        
+        return jsonify(result)
     
     except Exception as e:
         logger.exception("Error processing audio")
         return jsonify({"error": str(e)}), 500
+    
+    finally:
+        if session is not None:
+            # A profiling failure must not replace the real response
+            try:
+                profiler.finish(session)
+            except Exception:
+                logger.exception("Error finishing request profile")
+
+@app.route('/search')
+@require_admin
+def search():
+    """Search the transcript history"""
+    if history_store is None:
+        return jsonify({"error": "Transcript history is disabled"}), 404
+    
+    try:
+        before_id = request.args.get('before_id')
+        before_id = int(before_id) if before_id else None
+        per_page = int(request.args.get('per_page', 20))
+    except ValueError:
+        return jsonify({"error": "before_id and per_page must be integers"}), 400
+    
+    if not 1 <= per_page <= 100:
+        return jsonify({"error": "per_page must be between 1 and 100"}), 400
+    
+    try:
+        results = history_store.search(
+            query=request.args.get('q'),
+            chat_id=request.args.get('chat_id'),
+            before_id=before_id,
+            per_page=per_page,
+        )
+        return jsonify(results)
+    
+    except Exception as e:
+        logger.exception("Error searching transcript history")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+@require_admin
+def admin_profile():
+    """Enable, inspect or reset request profiling"""
+    if request.method == 'DELETE':
+        profiler.reset()
+        return jsonify({"success": True})
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('enabled') is False:
+            profiler.disable()
+            return jsonify(profiler.status())
+        try:
+            profiler.enable(
+                requests=int(data.get('requests', 0)),
+                header=bool(data.get('header', False)),
+                mode=data.get('mode', 'sampling'),
+                torch_trace=bool(data.get('torch_trace', True)),
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(profiler.status())
+    
+    status = profiler.status()
+    status["collapsed"] = profiler.collapsed()
+    status["stats"] = profiler.stats_text()
+    return jsonify(status)
+
+@app.route('/admin/profile/collapsed')
+@require_admin
+def admin_profile_collapsed():
+    """Return the aggregate profile as flamegraph-ready collapsed stacks"""
+    return profiler.collapsed(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/admin/profile/<session_id>/collapsed')
+@require_admin
+def admin_profile_request_collapsed(session_id):
+    """Return a single request's profile as collapsed stacks"""
+    session = profiler.get_session(session_id)
+    if session is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if session.mode != 'sampling':
+        return jsonify({"error": "Collapsed stacks are only recorded in sampling mode, use /stats"}), 404
+    return format_collapsed(session.stacks), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/admin/profile/<session_id>/stats')
+@require_admin
+def admin_profile_request_stats(session_id):
+    """Return a single request's cProfile statistics"""
+    session = profiler.get_session(session_id)
+    if session is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if session.stats is None:
+        return jsonify({"error": "Statistics are only recorded in cprofile mode, use /collapsed"}), 404
+    return format_stats(session.stats), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/admin/profile/<session_id>/trace')
+@require_admin
+def admin_profile_request_trace(session_id):
+    """Return a single request's torch profiler trace of the transcription step"""
+    session = profiler.get_session(session_id)
+    if session is None or session.trace_path is None:
+        return jsonify({"error": "Trace not found"}), 404
+    return send_file(session.trace_path, mimetype='application/json', as_attachment=True)
 
 @app.route('/status')
 def status():
@@ -100,6 +251,7 @@ def status():
     return jsonify({
         "server": "running",
         "models_initialized": transcriber is not None and entity_extractor is not None,
+        "history_enabled": history_store is not None,
     })
 
 @app.route('/static/<path:path>')
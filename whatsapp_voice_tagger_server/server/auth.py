@@ -0,0 +1,19 @@
+import os
+import hmac
+from functools import wraps
+from flask import request, jsonify
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def require_admin(view):
+    """Reject requests without a matching X-Admin-Token header"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Admin endpoints are disabled, set ADMIN_TOKEN"}), 403
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({"error": "Invalid admin token"}), 401
+        return view(*args, **kwargs)
+    return wrapper
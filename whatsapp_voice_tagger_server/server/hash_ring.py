@@ -0,0 +1,103 @@
+import bisect
+import hashlib
+
+def _hash(key):
+    """
+    Hash a key onto the ring
+
+    Args:
+        key (str): The key to hash
+
+    Returns:
+        int: Position on the ring
+    """
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+class ConsistentHashRing:
+    """Class to map keys onto nodes so that membership changes move as few keys as possible"""
+
+    def __init__(self, nodes=(), replicas=100):
+        """
+        Initialize the ConsistentHashRing
+
+        Args:
+            nodes (iterable): Initial node identifiers
+            replicas (int): Number of virtual points per node, for an even spread
+        """
+        self.replicas = replicas
+        self._positions = []
+        self._owners = {}
+        self._nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """
+        Add a node to the ring
+
+        Args:
+            node (str): The node identifier
+        """
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            position = _hash(f"{node}#{i}")
+            self._owners[position] = node
+            bisect.insort(self._positions, position)
+
+    def remove(self, node):
+        """
+        Remove a node from the ring
+
+        Args:
+            node (str): The node identifier
+        """
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        removed = {_hash(f"{node}#{i}") for i in range(self.replicas)}
+        self._positions = [p for p in self._positions if p not in removed]
+        for position in removed:
+            self._owners.pop(position, None)
+
+    @property
+    def nodes(self):
+        """set: The nodes currently on the ring"""
+        return set(self._nodes)
+
+    def iter_nodes(self, key):
+        """
+        Yield distinct nodes for a key, starting with its owner
+
+        The following nodes are the fallbacks to try, in order, if the owner fails.
+
+        Args:
+            key (str): The routing key
+
+        Yields:
+            str: Node identifiers
+        """
+        if not self._positions:
+            return
+        start = bisect.bisect(self._positions, _hash(key)) % len(self._positions)
+        seen = set()
+        for offset in range(len(self._positions)):
+            node = self._owners[self._positions[(start + offset) % len(self._positions)]]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self._nodes):
+                    return
+
+    def get_node(self, key):
+        """
+        Get the node that owns a key
+
+        Args:
+            key (str): The routing key
+
+        Returns:
+            str: The owning node, or None if the ring is empty
+        """
+        return next(self.iter_nodes(key), None)
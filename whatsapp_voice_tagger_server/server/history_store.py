@@ -0,0 +1,367 @@
+import os
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    chat_id TEXT,
+    addressee TEXT,
+    transcription TEXT NOT NULL,
+    duration REAL,
+    transcribe_ms REAL,
+    extract_ms REAL,
+    total_ms REAL
+);
+CREATE INDEX IF NOT EXISTS idx_transcripts_created_at ON transcripts(created_at);
+CREATE INDEX IF NOT EXISTS idx_transcripts_chat_id ON transcripts(chat_id, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+    transcription,
+    addressee,
+    content='transcripts',
+    content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN
+    INSERT INTO transcripts_fts(rowid, transcription, addressee)
+    VALUES (new.id, new.transcription, new.addressee);
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_ad AFTER DELETE ON transcripts BEGIN
+    INSERT INTO transcripts_fts(transcripts_fts, rowid, transcription, addressee)
+    VALUES ('delete', old.id, old.transcription, old.addressee);
+END;
+"""
+
+COLUMNS = (
+    "id", "created_at", "chat_id", "addressee", "transcription",
+    "duration", "transcribe_ms", "extract_ms", "total_ms",
+)
+
+class TranscriptHistoryStore:
+    """Class to persist transcripts in SQLite with a full-text index"""
+
+    def __init__(self, db_path, retention_days=None, batch_size=100,
+                 flush_interval=1.0, max_queue_size=10000):
+        """
+        Initialize the TranscriptHistoryStore and start its background writer
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            retention_days (float): Delete records older than this many days, or None to keep everything
+            batch_size (int): Maximum number of records written per transaction
+            flush_interval (float): Maximum seconds a record waits in the queue before being written
+            max_queue_size (int): Maximum number of pending records before new ones are dropped
+        """
+        logger.info(f"Initializing TranscriptHistoryStore at: {db_path}")
+
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Create the schema up front so readers never race the writer thread
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+        self._local = threading.local()
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopped = threading.Event()
+        self._last_prune = 0.0
+
+        self._writer = threading.Thread(target=self._run_writer, name="transcript-history-writer")
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _connect(self):
+        """
+        Open a connection configured for concurrent readers and a single writer
+
+        Returns:
+            sqlite3.Connection: The new connection
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _reader(self):
+        """
+        Get the calling thread's read connection, opening it on first use
+
+        Returns:
+            sqlite3.Connection: The read connection
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+        return conn
+
+    def record(self, transcription, addressee=None, chat_id=None, duration=None,
+               transcribe_ms=None, extract_ms=None, total_ms=None):
+        """
+        Queue a transcript to be written by the background writer
+
+        This never blocks on disk; if the queue is full the record is dropped.
+
+        Args:
+            transcription (str): The transcribed text
+            addressee (str): The extracted addressee, if any
+            chat_id (str): Identifier of the chat the voice note belongs to
+            duration (float): Audio duration in seconds
+            transcribe_ms (float): Time spent transcribing, in milliseconds
+            extract_ms (float): Time spent extracting the addressee, in milliseconds
+            total_ms (float): Total request processing time, in milliseconds
+
+        Returns:
+            bool: True if the record was queued, False if it was dropped
+        """
+        row = (time.time(), chat_id, addressee, transcription or "",
+               duration, transcribe_ms, extract_ms, total_ms)
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            logger.warning("Transcript history queue is full, dropping record")
+            return False
+
+    def _run_writer(self):
+        """Drain the queue in batches, one transaction per batch"""
+        conn = self._connect()
+        try:
+            while not self._stopped.is_set() or not self._queue.empty():
+                batch = self._next_batch()
+                if batch:
+                    self._write_batch(conn, batch)
+                self._maybe_prune(conn)
+        finally:
+            conn.close()
+
+    def _next_batch(self):
+        """
+        Collect up to batch_size queued records, waiting at most flush_interval
+
+        Returns:
+            list: The collected rows
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if row is None:
+                # Wake-up from close(); write what we have now
+                self._queue.task_done()
+                break
+            batch.append(row)
+        return batch
+
+    def _write_batch(self, conn, batch):
+        """
+        Insert a batch of rows in a single transaction
+
+        Args:
+            conn (sqlite3.Connection): The writer connection
+            batch (list): Rows to insert
+        """
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO transcripts (created_at, chat_id, addressee, transcription, "
+                    "duration, transcribe_ms, extract_ms, total_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+            logger.debug(f"Wrote {len(batch)} transcripts to history")
+        except Exception as e:
+            logger.error(f"Error writing transcript history: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _maybe_prune(self, conn):
+        """
+        Run retention pruning at most once a minute from the writer thread
+
+        Args:
+            conn (sqlite3.Connection): The writer connection
+        """
+        if self.retention_days is None:
+            return
+        now = time.monotonic()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        self._prune(conn, self.retention_days)
+
+    def _prune(self, conn, retention_days, chunk_size=5000):
+        """
+        Delete records older than the retention window in small chunks
+
+        Chunking keeps each write transaction short so readers are not starved.
+
+        Args:
+            conn (sqlite3.Connection): The writer connection
+            retention_days (float): Age in days beyond which records are deleted
+            chunk_size (int): Maximum rows deleted per transaction
+
+        Returns:
+            int: Number of records deleted
+        """
+        cutoff = time.time() - retention_days * 86400
+        deleted = 0
+        try:
+            while True:
+                with conn:
+                    cursor = conn.execute(
+                        "DELETE FROM transcripts WHERE id IN ("
+                        "SELECT id FROM transcripts WHERE created_at < ? ORDER BY created_at LIMIT ?)",
+                        (cutoff, chunk_size),
+                    )
+                deleted += cursor.rowcount
+                if cursor.rowcount < chunk_size:
+                    break
+            if deleted:
+                logger.info(f"Pruned {deleted} transcripts older than {retention_days} days")
+        except Exception as e:
+            logger.error(f"Error pruning transcript history: {e}")
+        return deleted
+
+    def prune(self, retention_days=None):
+        """
+        Delete records older than the retention window
+
+        Args:
+            retention_days (float): Age in days beyond which records are deleted,
+                defaults to the store's configured retention
+
+        Returns:
+            int: Number of records deleted
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        if retention_days is None:
+            return 0
+        conn = self._connect()
+        try:
+            return self._prune(conn, retention_days)
+        finally:
+            conn.close()
+
+    def search(self, query=None, chat_id=None, before_id=None, per_page=20):
+        """
+        Search stored transcripts, newest first
+
+        Pages use a keyset cursor rather than OFFSET, so every page costs the
+        same however deep it is.
+
+        Args:
+            query (str): Full-text query; every word must match, a trailing '*' matches prefixes
+            chat_id (str): Restrict results to this chat
+            before_id (int): Only return records older than this id, from a previous page's next_before_id
+            per_page (int): Number of results per page
+
+        Returns:
+            dict: The page of results and the cursor for the next page, or None on the last page
+        """
+        params = []
+        where = []
+
+        if query:
+            sql = (
+                "SELECT t.id, t.created_at, t.chat_id, t.addressee, t.transcription, "
+                "t.duration, t.transcribe_ms, t.extract_ms, t.total_ms "
+                "FROM transcripts_fts JOIN transcripts t ON t.id = transcripts_fts.rowid "
+            )
+            where.append("transcripts_fts MATCH ?")
+            params.append(self._fts_query(query))
+            id_column = "transcripts_fts.rowid"
+        else:
+            sql = f"SELECT {', '.join(COLUMNS)} FROM transcripts t "
+            id_column = "t.id"
+
+        if chat_id:
+            where.append("t.chat_id = ?")
+            params.append(chat_id)
+
+        if before_id is not None:
+            where.append(f"{id_column} < ?")
+            params.append(before_id)
+
+        if where:
+            sql += "WHERE " + " AND ".join(where) + " "
+
+        # Fetch one extra row to know whether another page exists without a COUNT(*)
+        sql += f"ORDER BY {id_column} DESC LIMIT ?"
+        params.append(per_page + 1)
+
+        rows = self._reader().execute(sql, params).fetchall()
+        results = [dict(zip(COLUMNS, row)) for row in rows[:per_page]]
+
+        return {
+            "per_page": per_page,
+            "next_before_id": results[-1]["id"] if len(rows) > per_page else None,
+            "results": results,
+        }
+
+    @staticmethod
+    def _fts_query(query):
+        """
+        Turn free text into a safe FTS5 query
+
+        Each word is quoted so user input cannot inject FTS5 syntax.
+
+        Args:
+            query (str): The user's search text
+
+        Returns:
+            str: The FTS5 MATCH expression
+        """
+        terms = []
+        for word in query.split():
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', '""')
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+        return " ".join(terms) or '""'
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued record has been written
+
+        Args:
+            timeout (float): Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the queue was drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """Stop the background writer after draining pending records"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._queue.put(None)
+        self._writer.join()
@@ -0,0 +1,415 @@
+import os
+import sys
+import io
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import tempfile
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_MODES = ("sampling", "cprofile")
+
+# Only one torch profiler can run per process, so concurrent requests skip the trace
+_torch_trace_lock = threading.Lock()
+
+def _frame_label(frame):
+    """
+    Format a frame for collapsed-stack output
+
+    Args:
+        frame (frame): The Python frame
+
+    Returns:
+        str: A label such as "transcribe (transcriber.py:35)"
+    """
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def format_collapsed(stacks):
+    """
+    Render stack counts in the collapsed format read by flamegraph.pl and speedscope
+
+    Args:
+        stacks (Counter): Semicolon-joined stacks mapped to sample counts
+
+    Returns:
+        str: One "stack count" line per stack
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def format_stats(stats, limit=50):
+    """
+    Render cProfile statistics as text
+
+    Args:
+        stats (pstats.Stats): The statistics to render
+        limit (int): Number of functions to include
+
+    Returns:
+        str: The statistics sorted by cumulative time
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+class StackSampler:
+    """Class to sample a single thread's Python stack from a background thread"""
+
+    def __init__(self, thread_id, interval=0.005):
+        """
+        Initialize the StackSampler
+
+        Args:
+            thread_id (int): Identifier of the thread to sample
+            interval (float): Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler")
+        self._thread.daemon = True
+
+    def start(self):
+        """Start sampling"""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread to exit"""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+class ProfileSession:
+    """Class to hold the profile of a single request"""
+
+    def __init__(self, mode, torch_trace, trace_dir, interval):
+        """
+        Initialize the ProfileSession
+
+        Args:
+            mode (str): 'sampling' or 'cprofile'
+            torch_trace (bool): Whether to record a torch profiler trace of transcription
+            trace_dir (str): Directory to write torch traces to
+            interval (float): Seconds between samples in sampling mode
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.torch_trace = torch_trace
+        self.trace_dir = trace_dir
+        self.trace_path = None
+        self.started_at = time.time()
+        self.wall_ms = None
+        self.stacks = Counter()
+        self.stats = None
+        self._start = time.perf_counter()
+
+        if mode == "cprofile":
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Only one cProfile can run at a time; concurrent requests are sampled instead
+                logger.warning("cProfile already active in another request, sampling instead")
+                self.mode = mode = "sampling"
+
+        if mode == "sampling":
+            self._sampler = StackSampler(threading.get_ident(), interval=interval)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop profiling and collect the results"""
+        if self.mode == "cprofile":
+            self._profile.disable()
+            # cProfile keeps no full call stacks, so it only produces statistics, not collapsed stacks
+            self.stats = pstats.Stats(self._profile)
+        else:
+            self._sampler.stop()
+            self.stacks = self._sampler.stacks
+        self.wall_ms = (time.perf_counter() - self._start) * 1000
+
+    @contextmanager
+    def trace_transcription(self):
+        """
+        Record a torch profiler trace around the transcription step, if requested
+
+        Yields:
+            None
+        """
+        if not self.torch_trace:
+            yield
+            return
+
+        if not _torch_trace_lock.acquire(blocking=False):
+            logger.warning(f"Another torch trace is running, skipping trace for request {self.id}")
+            yield
+            return
+
+        # Profiler failures are logged and never fail the request being profiled
+        try:
+            prof = None
+            try:
+                import torch
+                from torch.profiler import profile, ProfilerActivity
+
+                activities = [ProfilerActivity.CPU]
+                if torch.cuda.is_available():
+                    activities.append(ProfilerActivity.CUDA)
+
+                prof = profile(activities=activities, record_shapes=True)
+                prof.start()
+            except Exception as e:
+                logger.error(f"Error starting torch profiler: {e}")
+                prof = None
+
+            try:
+                yield
+            finally:
+                if prof is not None:
+                    self._export_trace(prof)
+        finally:
+            _torch_trace_lock.release()
+
+    def _export_trace(self, prof):
+        """
+        Stop the torch profiler and write its trace
+
+        Args:
+            prof (torch.profiler.profile): The running profiler
+        """
+        trace_path = os.path.join(self.trace_dir, f"{self.id}.json")
+        try:
+            prof.stop()
+            os.makedirs(self.trace_dir, exist_ok=True)
+            prof.export_chrome_trace(trace_path)
+            self.trace_path = trace_path
+            logger.info(f"Wrote torch profiler trace to {trace_path}")
+        except Exception as e:
+            logger.error(f"Error exporting torch profiler trace: {e}")
+            if os.path.exists(trace_path):
+                os.remove(trace_path)
+
+    def remove_trace(self):
+        """Delete the torch trace file, if one was written"""
+        if self.trace_path is None:
+            return
+        try:
+            os.remove(self.trace_path)
+        except OSError as e:
+            logger.warning(f"Error removing torch profiler trace: {e}")
+        self.trace_path = None
+
+    def summary(self):
+        """
+        Summarize the session for the admin endpoint
+
+        Returns:
+            dict: Metadata about the profiled request
+        """
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "wall_ms": self.wall_ms,
+            "stacks": len(self.stacks),
+            "torch_trace": self.trace_path is not None,
+        }
+
+class RequestProfiler:
+    """Class to profile selected requests on demand and aggregate the results"""
+
+    def __init__(self, trace_dir=None, history_size=50):
+        """
+        Initialize the RequestProfiler, disabled
+
+        Args:
+            trace_dir (str): Directory to write torch traces to
+            history_size (int): Number of per-request profiles to keep
+        """
+        self.trace_dir = trace_dir or os.path.join(tempfile.gettempdir(), "whatsapp_voice_tagger_profiles")
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Disable profiling and discard collected profiles and their trace files"""
+        with self._lock:
+            for session in getattr(self, "sessions", ()):
+                session.remove_trace()
+            # Checked on every request, so it must stay a plain attribute
+            self.active = False
+            self.remaining = 0
+            self.header_mode = False
+            self.mode = "sampling"
+            self.torch_trace = False
+            self.interval = 0.005
+            self.stacks = Counter()
+            self.stats = None
+            self.sessions = deque(maxlen=self.history_size)
+
+    def enable(self, requests=0, header=False, mode="sampling", torch_trace=True, interval=0.005):
+        """
+        Turn on profiling
+
+        Args:
+            requests (int): Profile the next N requests
+            header (bool): Profile every request carrying the X-Profile header until disabled
+            mode (str): 'sampling' or 'cprofile'
+            torch_trace (bool): Whether to record a torch profiler trace of transcription
+            interval (float): Seconds between samples in sampling mode
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+        if requests < 0:
+            raise ValueError("requests must be >= 0")
+        if not requests and not header:
+            raise ValueError("Either requests or header must be set")
+
+        with self._lock:
+            self.remaining = requests
+            self.header_mode = header
+            self.mode = mode
+            self.torch_trace = torch_trace
+            self.interval = interval
+            self.active = True
+        logger.info(f"Profiling enabled: requests={requests}, header={header}, mode={mode}")
+
+    def disable(self):
+        """Stop profiling new requests but keep what was collected"""
+        with self._lock:
+            self.active = False
+            self.remaining = 0
+            self.header_mode = False
+
+    def begin(self, headers):
+        """
+        Start profiling the current request if it is selected
+
+        Args:
+            headers (Mapping): The request headers
+
+        Returns:
+            ProfileSession: The session, or None if this request is not profiled
+        """
+        with self._lock:
+            selected = self.header_mode and headers.get(PROFILE_HEADER)
+            if not selected:
+                if self.remaining <= 0:
+                    return None
+                self.remaining -= 1
+                self.active = self.remaining > 0 or self.header_mode
+            mode, torch_trace, interval = self.mode, self.torch_trace, self.interval
+
+        return ProfileSession(mode, torch_trace, self.trace_dir, interval)
+
+    def finish(self, session):
+        """
+        Stop a session and merge it into the aggregate profile
+
+        Args:
+            session (ProfileSession): The session to finish
+        """
+        session.stop()
+        with self._lock:
+            self.stacks.update(session.stacks)
+            if session.stats is not None:
+                if self.stats is None:
+                    self.stats = pstats.Stats()
+                self.stats.add(session.stats)
+            if len(self.sessions) == self.sessions.maxlen:
+                # The oldest session is about to be evicted; its trace would otherwise leak
+                self.sessions[0].remove_trace()
+            self.sessions.append(session)
+        logger.info(f"Profiled request {session.id} in {session.wall_ms:.1f} ms")
+
+    def get_session(self, session_id):
+        """
+        Look up a kept per-request profile
+
+        Args:
+            session_id (str): The session id
+
+        Returns:
+            ProfileSession: The session, or None if it is unknown or was evicted
+        """
+        with self._lock:
+            for session in self.sessions:
+                if session.id == session_id:
+                    return session
+        return None
+
+    def collapsed(self):
+        """
+        Get the aggregate profile in collapsed-stack format
+
+        Only sampling-mode requests contribute; cProfile requests are in stats_text().
+
+        Returns:
+            str: Flamegraph-ready collapsed stacks
+        """
+        with self._lock:
+            return format_collapsed(self.stacks)
+
+    def stats_text(self, limit=50):
+        """
+        Get the aggregate cProfile statistics as text
+
+        Args:
+            limit (int): Number of functions to include
+
+        Returns:
+            str: The statistics sorted by cumulative time, or None if no cProfile data exists
+        """
+        with self._lock:
+            if self.stats is None:
+                return None
+            return format_stats(self.stats, limit)
+
+    def status(self):
+        """
+        Summarize the profiler state for the admin endpoint
+
+        Returns:
+            dict: Current settings and profiled requests
+        """
+        with self._lock:
+            return {
+                "active": self.active,
+                "remaining": self.remaining,
+                "header_mode": self.header_mode,
+                "header": PROFILE_HEADER,
+                "mode": self.mode,
+                "torch_trace": self.torch_trace,
+                "requests": [session.summary() for session in self.sessions],
+            }
+
+def transcription_trace(session):
+    """
+    Get the torch trace context for the transcription step
+
+    Args:
+        session (ProfileSession): The current session, or None when not profiling
+
+    Returns:
+        contextmanager: The trace context, or a no-op context
+    """
+    if session is None:
+        return nullcontext()
+    return session.trace_transcription()
@@ -0,0 +1,291 @@
+import os
+import hashlib
+import logging
+import threading
+import requests
+from flask import Flask, request, jsonify, Response
+from flask_cors import CORS
+
+from server.auth import require_admin
+from server.hash_ring import ConsistentHashRing
+from server.profiler import PROFILE_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Response headers that must not be copied from a backend response
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "content-encoding", "content-length",
+}
+
+# Request headers passed through to the backend node
+FORWARDED_HEADERS = ("X-Admin-Token", PROFILE_HEADER)
+
+class NodePool:
+    """Class to track backend nodes and keep only healthy ones on the hash ring"""
+
+    def __init__(self, nodes, check_interval=5.0, check_timeout=2.0, replicas=100):
+        """
+        Initialize the NodePool and start health checking
+
+        Args:
+            nodes (iterable): Base URLs of the backend servers
+            check_interval (float): Seconds between health checks
+            check_timeout (float): Timeout for each /status request
+            replicas (int): Number of virtual points per node on the ring
+        """
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.ring = ConsistentHashRing(replicas=replicas)
+        self._members = set()
+        self._health = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        for node in nodes:
+            self.join(node)
+
+        self._checker = threading.Thread(target=self._run_health_checks, name="router-health-checker")
+        self._checker.daemon = True
+        self._checker.start()
+
+    def join(self, node):
+        """
+        Add a backend node; it goes on the ring once its health check passes
+
+        Args:
+            node (str): Base URL of the backend server
+        """
+        node = node.rstrip("/")
+        with self._lock:
+            self._members.add(node)
+            self._health.setdefault(node, {"healthy": False, "models_initialized": False})
+        self.check_node(node)
+
+    def leave(self, node):
+        """
+        Remove a backend node and rebalance its keys onto the remaining nodes
+
+        Args:
+            node (str): Base URL of the backend server
+        """
+        node = node.rstrip("/")
+        with self._lock:
+            self._members.discard(node)
+            self._health.pop(node, None)
+            self.ring.remove(node)
+        logger.info(f"Node left: {node}")
+
+    def check_node(self, node):
+        """
+        Check a node's /status endpoint and update the ring accordingly
+
+        A node only takes traffic once its models are initialized.
+
+        Args:
+            node (str): Base URL of the backend server
+
+        Returns:
+            bool: True if the node is healthy
+        """
+        try:
+            response = requests.get(f"{node}/status", timeout=self.check_timeout)
+            response.raise_for_status()
+            models_initialized = bool(response.json().get("models_initialized"))
+        except Exception as e:
+            logger.debug(f"Health check failed for {node}: {e}")
+            models_initialized = None
+
+        healthy = bool(models_initialized)
+        self._set_health(node, healthy, models_initialized=bool(models_initialized))
+        return healthy
+
+    def mark_unhealthy(self, node):
+        """
+        Take a node off the ring after a failed request, until its next health check passes
+
+        Args:
+            node (str): Base URL of the backend server
+        """
+        self._set_health(node, False)
+
+    def _set_health(self, node, healthy, models_initialized=None):
+        with self._lock:
+            if node not in self._members:
+                return
+            state = self._health[node]
+            was_healthy = state["healthy"]
+            state["healthy"] = healthy
+            if models_initialized is not None:
+                state["models_initialized"] = models_initialized
+            if healthy and not was_healthy:
+                self.ring.add(node)
+                logger.info(f"Node is healthy, added to ring: {node}")
+            elif was_healthy and not healthy:
+                self.ring.remove(node)
+                logger.warning(f"Node is unhealthy, removed from ring: {node}")
+
+    def _run_health_checks(self):
+        while not self._stopped.wait(self.check_interval):
+            with self._lock:
+                members = list(self._members)
+            for node in members:
+                self.check_node(node)
+
+    def candidates(self, key):
+        """
+        Get the healthy nodes to try for a key, owner first
+
+        Args:
+            key (str): The routing key
+
+        Returns:
+            list: Base URLs of the nodes to try, in order
+        """
+        with self._lock:
+            return list(self.ring.iter_nodes(key))
+
+    def status(self):
+        """
+        Get the health of every known node
+
+        Returns:
+            dict: Node URL mapped to its health state
+        """
+        with self._lock:
+            return {node: dict(state) for node, state in self._health.items()}
+
+    def stop(self):
+        """Stop the background health checker"""
+        self._stopped.set()
+
+def routing_key(chat_id, audio_bytes):
+    """
+    Choose the key used to pick a backend for a request
+
+    Args:
+        chat_id (str): The chat id sent with the request, if any
+        audio_bytes (bytes): The uploaded audio
+
+    Returns:
+        str: The routing key
+    """
+    if chat_id:
+        return f"chat:{chat_id}"
+    return "audio:" + hashlib.sha1(audio_bytes).hexdigest()
+
+def create_router_app(nodes, request_timeout=120.0, check_interval=5.0):
+    """
+    Create a Flask app that forwards requests to backend transcription servers
+
+    Args:
+        nodes (iterable): Base URLs of the backend servers
+        request_timeout (float): Timeout for forwarded requests
+        check_interval (float): Seconds between health checks
+
+    Returns:
+        Flask: The router app
+    """
+    router_app = Flask(__name__)
+    CORS(router_app)
+    pool = NodePool(nodes, check_interval=check_interval)
+    router_app.config['NODE_POOL'] = pool
+
+    def forward(candidates, method, path, **kwargs):
+        """Send a request to the first candidate that accepts it, failing over if a node is unreachable"""
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        for node in candidates:
+            try:
+                response = requests.request(
+                    method, f"{node}{path}", headers=headers, timeout=request_timeout, **kwargs
+                )
+            except requests.ConnectionError as e:
+                # Includes ConnectTimeout: the node never got the request, so another can take it
+                logger.warning(f"Could not reach {node}, failing over: {e}")
+                pool.mark_unhealthy(node)
+                continue
+            except requests.Timeout as e:
+                # The node is busy with this request; failing over would transcribe it twice
+                logger.warning(f"Request to {node} timed out: {e}")
+                return jsonify({"error": "Backend node timed out"}), 504
+            except requests.RequestException as e:
+                logger.error(f"Request to {node} failed: {e}")
+                return jsonify({"error": "Backend request failed"}), 502
+
+            # A 5xx is the node's answer for this audio; retrying elsewhere would repeat the work
+            headers = [
+                (name, value) for name, value in response.headers.items()
+                if name.lower() not in HOP_BY_HOP_HEADERS
+            ]
+            headers.append(("X-Routed-To", node))
+            return Response(response.content, status=response.status_code, headers=headers)
+
+        return jsonify({"error": "No healthy backend nodes available"}), 503
+
+    @router_app.route('/process_audio', methods=['POST'])
+    def process_audio():
+        """Route an audio file to the node that owns its chat id or audio hash"""
+        if 'audio' not in request.files:
+            return jsonify({"error": "No audio file provided"}), 400
+
+        audio_file = request.files['audio']
+        audio_bytes = audio_file.read()
+        key = routing_key(request.form.get('chat_id'), audio_bytes)
+
+        return forward(
+            pool.candidates(key), 'POST', '/process_audio',
+            data=request.form.to_dict(),
+            files={'audio': (audio_file.filename, audio_bytes, audio_file.mimetype)},
+        )
+
+    @router_app.route('/search')
+    def search():
+        """Route a history search to the node that owns the chat"""
+        chat_id = request.args.get('chat_id')
+        if not chat_id:
+            return jsonify({"error": "chat_id is required when searching through the router"}), 400
+        return forward(pool.candidates(f"chat:{chat_id}"), 'GET', '/search', params=request.args)
+
+    @router_app.route('/status')
+    def status():
+        """Check the status of the router and its backend nodes"""
+        nodes = pool.status()
+        healthy = [node for node, state in nodes.items() if state["healthy"]]
+        return jsonify({
+            "server": "running",
+            "mode": "router",
+            "models_initialized": bool(healthy),
+            "nodes": nodes,
+        })
+
+    @router_app.route('/router/nodes', methods=['POST', 'DELETE'])
+    @require_admin
+    def manage_nodes():
+        """Add or remove a backend node"""
+        data = request.get_json(silent=True) or {}
+        node = data.get('url')
+        if not node:
+            return jsonify({"error": "No node url provided"}), 400
+
+        if request.method == 'POST':
+            pool.join(node)
+        else:
+            pool.leave(node)
+        return jsonify({"success": True, "nodes": pool.status()})
+
+    @router_app.errorhandler(404)
+    def not_found(e):
+        """Handle 404 errors"""
+        return jsonify({"error": "Resource not found"}), 404
+
+    return router_app
+
+def router_nodes_from_env():
+    """
+    Read backend node URLs from the ROUTER_NODES environment variable
+
+    Returns:
+        list: Base URLs of the backend servers
+    """
+    value = os.environ.get("ROUTER_NODES", "")
+    return [node.strip() for node in value.split(",") if node.strip()]
@@ -41,6 +41,18 @@ class WhisperTranscriber:
         Returns:
             str: The transcribed text
         """
+        return self.transcribe_with_details(audio_path)["text"]
+    
+    def transcribe_with_details(self, audio_path):
+        """
+        Transcribe an audio file and report its duration
+        
+        Args:
+            audio_path (str): Path to the audio file to transcribe
+            
+        Returns:
+            dict: The transcribed text and the audio duration in seconds
+        """
         logger.info(f"Transcribing audio file: {audio_path}")
         
         try:
@@ -48,12 +60,14 @@ class WhisperTranscriber:
             if not os.path.exists(audio_path):
                 raise FileNotFoundError(f"Audio file not found: {audio_path}")
             
-            # Transcribe the audio
-            result = self.model.transcribe(audio_path, language = "en")
+            # Decode once so the duration comes from the audio itself, then transcribe the samples
+            audio = whisper.load_audio(audio_path)
+            duration = len(audio) / whisper.audio.SAMPLE_RATE
+            result = self.model.transcribe(audio, language = "en")
             transcription = result["text"].strip()
             
             logger.info(f"Transcription completed successfully")
-            return transcription
+            return {"text": transcription, "duration": duration}
         
         except Exception as e:
             logger.error(f"Error transcribing audio: {e}")
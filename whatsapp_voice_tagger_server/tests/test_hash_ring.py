@@ -0,0 +1,45 @@
+from collections import Counter
+
+from server.hash_ring import ConsistentHashRing
+
+KEYS = [f"chat:{i}" for i in range(5000)]
+
+def test_keys_spread_across_nodes():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    counts = Counter(ring.get_node(key) for key in KEYS)
+
+    assert set(counts) == {"a", "b", "c"}
+    assert min(counts.values()) > len(KEYS) / 3 * 0.7
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    before = {key: ring.get_node(key) for key in KEYS}
+
+    ring.add("d")
+    moved = [key for key in KEYS if ring.get_node(key) != before[key]]
+
+    assert moved
+    assert all(ring.get_node(key) == "d" for key in moved)
+
+def test_removing_a_node_restores_previous_owners():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    before = {key: ring.get_node(key) for key in KEYS}
+
+    ring.add("d")
+    ring.remove("d")
+
+    assert all(ring.get_node(key) == before[key] for key in KEYS)
+
+def test_iter_nodes_yields_each_node_once_owner_first():
+    ring = ConsistentHashRing(["a", "b", "c"])
+
+    nodes = list(ring.iter_nodes("chat:1"))
+
+    assert nodes[0] == ring.get_node("chat:1")
+    assert sorted(nodes) == ["a", "b", "c"]
+
+def test_empty_ring():
+    ring = ConsistentHashRing()
+
+    assert ring.get_node("chat:1") is None
+    assert list(ring.iter_nodes("chat:1")) == []
@@ -0,0 +1,92 @@
+import sqlite3
+import time
+
+import pytest
+
+from server.history_store import TranscriptHistoryStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = TranscriptHistoryStore(str(tmp_path / "history.db"), flush_interval=0.05)
+    yield store
+    store.close()
+
+def test_records_are_written_in_background(store):
+    assert store.record("Hey John, check the document", addressee="John", chat_id="chat-1", duration=2.5)
+    assert store.flush(timeout=5)
+
+    result = store.search()
+    assert len(result["results"]) == 1
+    row = result["results"][0]
+    assert row["transcription"] == "Hey John, check the document"
+    assert row["addressee"] == "John"
+    assert row["chat_id"] == "chat-1"
+    assert row["duration"] == 2.5
+
+def test_full_text_search_and_chat_filter(store):
+    store.record("Hey John, check the document", chat_id="a")
+    store.record("Sarah, can you call me back", chat_id="a")
+    store.record("John, please send the invoice", chat_id="b")
+    store.flush(timeout=5)
+
+    assert {r["chat_id"] for r in store.search("john")["results"]} == {"a", "b"}
+    assert [r["chat_id"] for r in store.search("john", chat_id="b")["results"]] == ["b"]
+    assert len(store.search("doc*")["results"]) == 1
+    assert store.search("nobody")["results"] == []
+
+def test_search_input_cannot_inject_fts_syntax(store):
+    store.record('quote " AND OR NEAR(')
+    store.flush(timeout=5)
+
+    assert len(store.search('" AND OR NEAR(')["results"]) == 1
+
+def test_keyset_pagination_walks_all_records_newest_first(store):
+    for i in range(25):
+        store.record(f"note {i}")
+    store.flush(timeout=5)
+
+    seen = []
+    before_id = None
+    while True:
+        page = store.search(before_id=before_id, per_page=10)
+        seen.extend(r["transcription"] for r in page["results"])
+        before_id = page["next_before_id"]
+        if before_id is None:
+            break
+
+    assert seen == [f"note {i}" for i in reversed(range(25))]
+
+def test_keyset_pagination_with_query(store):
+    for i in range(5):
+        store.record(f"john {i}")
+    store.flush(timeout=5)
+
+    first = store.search("john", per_page=3)
+    second = store.search("john", before_id=first["next_before_id"], per_page=3)
+    assert [r["transcription"] for r in first["results"] + second["results"]] == [
+        f"john {i}" for i in reversed(range(5))
+    ]
+    assert second["next_before_id"] is None
+
+def test_prune_removes_old_records_from_table_and_index(store):
+    store.record("old john note")
+    store.flush(timeout=5)
+    conn = sqlite3.connect(store.db_path)
+    with conn:
+        conn.execute("UPDATE transcripts SET created_at = ?", (time.time() - 10 * 86400,))
+    conn.close()
+    store.record("new john note")
+    store.flush(timeout=5)
+
+    assert store.prune(retention_days=5) == 1
+    assert [r["transcription"] for r in store.search("john")["results"]] == ["new john note"]
+
+def test_close_writes_pending_records(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = TranscriptHistoryStore(path, flush_interval=10)
+    store.record("pending note")
+    store.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT transcription FROM transcripts").fetchall() == [("pending note",)]
+    conn.close()
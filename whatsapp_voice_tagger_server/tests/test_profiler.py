@@ -0,0 +1,118 @@
+import sys
+import time
+
+import pytest
+
+from server import profiler as profiler_module
+from server.profiler import RequestProfiler, transcription_trace
+
+def busy_work(seconds=0.05):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+def profile_request(profiler, headers=None):
+    session = profiler.begin(headers or {}) if profiler.active else None
+    if session is not None:
+        busy_work()
+        profiler.finish(session)
+    return session
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(trace_dir=str(tmp_path / "profiles"), history_size=2)
+
+def test_disabled_by_default(profiler):
+    assert profiler.active is False
+    assert profile_request(profiler) is None
+
+def test_profiles_next_n_requests_only(profiler):
+    profiler.enable(requests=2, torch_trace=False)
+
+    sessions = [profile_request(profiler) for _ in range(3)]
+
+    assert sessions[0] is not None and sessions[1] is not None
+    assert sessions[2] is None
+    assert profiler.active is False
+
+def test_sampling_aggregates_collapsed_stacks(profiler):
+    profiler.enable(requests=2, torch_trace=False)
+    profile_request(profiler)
+    profile_request(profiler)
+
+    lines = profiler.collapsed().splitlines()
+    assert any("busy_work (test_profiler.py:" in line for line in lines)
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+
+def test_cprofile_goes_to_stats_not_collapsed(profiler):
+    profiler.enable(requests=1, mode="cprofile", torch_trace=False)
+    session = profile_request(profiler)
+
+    assert session.mode == "cprofile"
+    assert profiler.collapsed() == ""
+    assert "busy_work" in profiler.stats_text()
+
+def test_header_mode_profiles_only_marked_requests(profiler):
+    profiler.enable(header=True, torch_trace=False)
+
+    assert profile_request(profiler) is None
+    assert profile_request(profiler, {"X-Profile": "1"}) is not None
+    assert profiler.active is True
+
+def test_enable_rejects_bad_arguments(profiler):
+    with pytest.raises(ValueError):
+        profiler.enable()
+    with pytest.raises(ValueError):
+        profiler.enable(requests=1, mode="unknown")
+
+def test_trace_files_removed_on_eviction_and_reset(profiler, tmp_path):
+    profiler.enable(requests=3, torch_trace=False)
+    paths = []
+    for i in range(3):
+        session = profiler.begin({})
+        path = tmp_path / f"trace{i}.json"
+        path.write_text("{}")
+        session.trace_path = str(path)
+        profiler.finish(session)
+        paths.append(path)
+
+    assert not paths[0].exists()
+    assert paths[1].exists() and paths[2].exists()
+
+    profiler.reset()
+    assert not any(path.exists() for path in paths)
+
+def test_torch_failure_does_not_break_the_request(profiler, monkeypatch):
+    monkeypatch.setitem(sys.modules, "torch", None)
+    profiler.enable(requests=1, torch_trace=True)
+    session = profiler.begin({})
+
+    with transcription_trace(session):
+        result = "transcribed"
+
+    profiler.finish(session)
+    assert result == "transcribed"
+    assert session.trace_path is None
+
+def test_concurrent_torch_trace_is_skipped(profiler):
+    profiler.enable(requests=1, torch_trace=True)
+    session = profiler.begin({})
+
+    with profiler_module._torch_trace_lock:
+        with transcription_trace(session):
+            pass
+
+    profiler.finish(session)
+    assert session.trace_path is None
+
+def test_errors_from_the_request_still_propagate(profiler):
+    profiler.enable(requests=1, torch_trace=False)
+    session = profiler.begin({})
+
+    with pytest.raises(RuntimeError):
+        with transcription_trace(session):
+            raise RuntimeError("transcription failed")
+
+    profiler.finish(session)
@@ -0,0 +1,144 @@
+import io
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+
+from server import router
+from server.router import NodePool, routing_key
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+@pytest.fixture
+def backends(monkeypatch):
+    """Map of node URL to its /status payload, or None when the node is down"""
+    state = {}
+
+    def fake_get(url, timeout=None):
+        payload = state.get(url.rsplit("/status", 1)[0])
+        if payload is None:
+            raise router.requests.ConnectionError("down")
+        return FakeResponse(payload)
+
+    monkeypatch.setattr(router.requests, "get", fake_get)
+    return state
+
+def make_pool(nodes):
+    pool = NodePool(nodes, check_interval=3600)
+    pool.stop()
+    return pool
+
+def test_only_nodes_with_models_join_the_ring(backends):
+    backends["http://a"] = {"models_initialized": True}
+    backends["http://b"] = {"models_initialized": False}
+
+    pool = make_pool(["http://a", "http://b", "http://c"])
+
+    assert pool.ring.nodes == {"http://a"}
+    assert pool.status()["http://b"]["healthy"] is False
+
+def test_failed_node_is_removed_and_rejoins_after_health_check(backends):
+    backends["http://a"] = {"models_initialized": True}
+    backends["http://b"] = {"models_initialized": True}
+    pool = make_pool(["http://a", "http://b"])
+    key = routing_key("chat-1", b"")
+    owner = pool.candidates(key)[0]
+
+    pool.mark_unhealthy(owner)
+    assert owner not in pool.candidates(key)
+
+    assert pool.check_node(owner)
+    assert pool.candidates(key)[0] == owner
+
+def test_join_and_leave_rebalance(backends):
+    backends["http://a"] = {"models_initialized": True}
+    backends["http://b"] = {"models_initialized": True}
+    pool = make_pool(["http://a"])
+
+    pool.join("http://b/")
+    assert pool.ring.nodes == {"http://a", "http://b"}
+
+    pool.leave("http://a")
+    assert pool.ring.nodes == {"http://b"}
+    assert "http://a" not in pool.status()
+
+def test_routing_key_prefers_chat_id():
+    assert routing_key("chat-1", b"audio") == "chat:chat-1"
+    assert routing_key(None, b"audio") == routing_key("", b"audio")
+    assert routing_key(None, b"audio") != routing_key(None, b"other")
+
+@pytest.fixture
+def router_app(backends, monkeypatch):
+    backends["http://a"] = {"models_initialized": True}
+    backends["http://b"] = {"models_initialized": True}
+    monkeypatch.setattr("server.auth.ADMIN_TOKEN", "secret")
+    app = router.create_router_app(["http://a", "http://b"], check_interval=3600)
+    yield app
+    app.config['NODE_POOL'].stop()
+
+def post_audio(client, chat_id="chat-1"):
+    return client.post(
+        "/process_audio",
+        data={"chat_id": chat_id, "audio": (io.BytesIO(b"audio"), "note.webm")},
+        content_type="multipart/form-data",
+    )
+
+class FakeBackendResponse:
+    status_code = 200
+    content = b'{"success": true}'
+    headers = {"Content-Type": "application/json"}
+
+def test_unreachable_owner_fails_over(router_app, monkeypatch):
+    pool = router_app.config['NODE_POOL']
+    owner, fallback = pool.candidates("chat:chat-1")
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(url)
+        if url.startswith(owner):
+            raise router.requests.ConnectionError("refused")
+        return FakeBackendResponse()
+
+    monkeypatch.setattr(router.requests, "request", fake_request)
+    response = post_audio(router_app.test_client())
+
+    assert response.status_code == 200
+    assert response.headers["X-Routed-To"] == fallback
+    assert owner not in pool.ring.nodes
+    assert len(calls) == 2
+
+def test_read_timeout_returns_504_without_failover(router_app, monkeypatch):
+    pool = router_app.config['NODE_POOL']
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(url)
+        raise router.requests.ReadTimeout("slow")
+
+    monkeypatch.setattr(router.requests, "request", fake_request)
+    response = post_audio(router_app.test_client())
+
+    assert response.status_code == 504
+    assert len(calls) == 1
+    assert pool.ring.nodes == {"http://a", "http://b"}
+
+def test_manage_nodes_requires_admin_token(router_app):
+    client = router_app.test_client()
+    pool = router_app.config['NODE_POOL']
+
+    response = client.delete("/router/nodes", json={"url": "http://a"})
+    assert response.status_code == 401
+    assert "http://a" in pool.ring.nodes
+
+    response = client.delete("/router/nodes", json={"url": "http://a"}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert "http://a" not in pool.ring.nodes